@@ -0,0 +1,18 @@
+"""
+Celery config for config project.
+
+Background workers pick up PDF processing so upload requests return as soon
+as the document is persisted. Start a worker for the PDF queue with:
+
+    celery -A config worker -Q pdf_parse
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+app = Celery('config')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -123,3 +123,19 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Celery
+# https://docs.celeryq.dev/en/stable/django/first-steps-with-django.html
+
+CELERY_BROKER_URL = 'redis://localhost:6379/0'
+CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
+CELERY_TASK_ROUTES = {
+    'core.tasks.process_document_task': {'queue': 'pdf_parse'},
+    'core.tasks.extract_questions_block': {'queue': 'pdf_parse'},
+    'core.tasks.merge_matches': {'queue': 'pdf_parse'},
+}
+# PDF parsing is CPU-heavy; hand each worker process one task at a time
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_WORKER_CONCURRENCY = 4
+CELERY_TASK_ACKS_LATE = True
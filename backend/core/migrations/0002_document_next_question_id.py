@@ -0,0 +1,27 @@
+# Generated by Django 5.1.4 on 2026-10-15 11:20
+
+from django.db import migrations, models
+
+
+def backfill_next_question_id(apps, schema_editor):
+    Document = apps.get_model('core', 'Document')
+    APIResponse = apps.get_model('core', 'APIResponse')
+    max_ids = APIResponse.objects.values('document').annotate(max_id=models.Max('question_id'))
+    for row in max_ids:
+        Document.objects.filter(pk=row['document']).update(next_question_id=row['max_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='next_question_id',
+            field=models.PositiveIntegerField(default=0, help_text="Highest question_id assigned to this document's responses"),
+        ),
+        migrations.RunPython(backfill_next_question_id, migrations.RunPython.noop),
+    ]
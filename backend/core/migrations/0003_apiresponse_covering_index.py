@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2026-10-15 11:45
+
+from django.db import migrations
+
+
+def create_covering_index(apps, schema_editor):
+    # INCLUDE columns and concurrent builds are PostgreSQL 11+ features.
+    # answer is left out: unbounded text would exceed the btree tuple size limit
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_apiresponse_doc_qid_covering '
+        'ON core_apiresponse (document_id, question_id) '
+        'INCLUDE (detail_level, tokens_used)'
+    )
+
+
+def drop_covering_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS idx_apiresponse_doc_qid_covering')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0002_document_next_question_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_covering_index, drop_covering_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-15 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_apiresponse_covering_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['user', '-uploaded_at', '-id'], name='core_docume_user_id_33e7e9_idx'),
+        ),
+    ]
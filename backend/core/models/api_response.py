@@ -1,5 +1,5 @@
 # core/models/api_response.py
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from .document import Document
@@ -63,11 +63,53 @@ class APIResponse(models.Model):
     def __str__(self):
         return f"Q{self.question_id}: {self.question[:50]}"
 
+    # Set by bulk_create_for_document, never taken from a payload
+    _ASSIGNED_FIELDS = frozenset({'document', 'document_id', 'question_id'})
+
+    @classmethod
+    def bulk_create_for_document(cls, document, payloads, batch_size=500):
+        """Create responses for a document with sequential question IDs.
+
+        Reserves the whole ID range with a single counter update.
+        Each payload holds APIResponse field values; ``user`` defaults to
+        the document owner. ``document`` and ``question_id`` are always
+        assigned here, in payload order, so payloads must not set them.
+        """
+        payloads = list(payloads)
+        for payload in payloads:
+            reserved = cls._ASSIGNED_FIELDS.intersection(payload)
+            if reserved:
+                raise ValueError(
+                    f"Payload must not set assigned fields: {', '.join(sorted(reserved))}"
+                )
+        with transaction.atomic():
+            existing_max = cls._reserve_question_ids(document.pk, len(payloads)) - len(payloads)
+            responses = [
+                cls(
+                    **{'user': document.user, **payload},
+                    document=document,
+                    question_id=existing_max + index
+                )
+                for index, payload in enumerate(payloads, start=1)
+            ]
+            return cls.objects.bulk_create(responses, batch_size=batch_size)
+
+    @staticmethod
+    def _reserve_question_ids(document_id, count):
+        # Bump the document's counter; the UPDATE row lock serializes
+        # concurrent inserts until the surrounding transaction commits
+        Document.objects.filter(pk=document_id).update(
+            next_question_id=models.F('next_question_id') + count
+        )
+        return Document.objects.values_list('next_question_id', flat=True).get(pk=document_id)
+
     def save(self, *args, **kwargs):
         # Ensure question_id is unique per document
-        if not self.pk:  # Only for new instances
-            existing_max = APIResponse.objects.filter(
-                document=self.document
-            ).aggregate(models.Max('question_id'))['question_id__max']
-            self.question_id = (existing_max or 0) + 1
-        super().save(*args, **kwargs)
+        if self.pk:
+            super().save(*args, **kwargs)
+            return
+
+        # Only for new instances
+        with transaction.atomic():
+            self.question_id = self._reserve_question_ids(self.document_id, 1)
+            super().save(*args, **kwargs)
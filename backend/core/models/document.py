@@ -3,8 +3,70 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import FileExtensionValidator
 from django.conf import settings
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import os
 
+# Unlinking relative to a directory fd skips the full path lookup per file
+_UNLINK_DIR_FD = os.unlink in os.supports_dir_fd
+
+# Below this many files, unlinking inline is cheaper than starting a thread pool
+DELETE_POOL_MIN_FILES = 8
+
+def _remove_file(file_path):
+    # A single unlink; a missing file raises FileNotFoundError instead of
+    # needing a separate exists() check
+    try:
+        os.unlink(file_path)
+    except OSError:
+        pass
+
+def _remove_directory_files(directory, names):
+    # A directory fd only pays off when it is reused for several files
+    dir_fd = None
+    if len(names) > 1 and _UNLINK_DIR_FD:
+        try:
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError:
+            pass
+    if dir_fd is None:
+        for name in names:
+            _remove_file(os.path.join(directory, name))
+        return
+
+    try:
+        for name in names:
+            try:
+                os.unlink(name, dir_fd=dir_fd)
+            except OSError:
+                pass
+    finally:
+        os.close(dir_fd)
+
+def delete_files(file_paths):
+    """Remove files, batching unlinks per directory where supported"""
+    file_paths = [path for path in file_paths if path]
+    if not file_paths:
+        return
+
+    files_by_directory = defaultdict(list)
+    for path in file_paths:
+        directory, name = os.path.split(path)
+        files_by_directory[directory].append(name)
+
+    if len(file_paths) < DELETE_POOL_MIN_FILES:
+        for directory, names in files_by_directory.items():
+            _remove_directory_files(directory, names)
+        return
+
+    # unlink releases the GIL, so large batches are spread over a few threads
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(
+            _remove_directory_files,
+            files_by_directory.keys(),
+            files_by_directory.values()
+        ))
+
 class Document(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending Processing'),
@@ -46,35 +108,56 @@ class Document(models.Model):
         help_text="File size in bytes",
         null=True
     )
+    next_question_id = models.PositiveIntegerField(
+        default=0,
+        help_text="Highest question_id assigned to this document's responses"
+    )
 
     class Meta:
         ordering = ['-uploaded_at']
         verbose_name = 'Document'
         verbose_name_plural = 'Documents'
+        indexes = [
+            models.Index(fields=['user', '-uploaded_at', '-id'])
+        ]
         
     def __str__(self):
         return f"{self.name} - {self.user.username}"
 
     def save(self, *args, **kwargs):
-        if self.file:
+        update_fields = kwargs.get('update_fields')
+        # next_question_id is only advanced atomically by APIResponse; a full
+        # update of an existing row must not overwrite it with a stale value.
+        # Like Django's own save, fields deferred by only()/defer() are skipped
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            excluded = self.get_deferred_fields() | {'next_question_id'}
+            update_fields = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in excluded
+            ]
+            kwargs['update_fields'] = update_fields
+        
+        # Only refresh file_size when the file itself is being written
+        if (update_fields is None or 'file' in update_fields) and self.file:
             self.file_size = self.file.size
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'file_size'}
         super().save(*args, **kwargs)
 
+    def file_paths(self):
+        """Paths of all files stored for this document"""
+        return [
+            field.path for field in (self.file, self.answers, self.preview)
+            if field
+        ]
+
     def delete(self, *args, **kwargs):
         # Store file paths before deletion
-        files_to_delete = [
-            self.file.path if self.file else None,
-            self.answers.path if self.answers else None,
-            self.preview.path if self.preview else None
-        ]
+        files_to_delete = self.file_paths()
         
         # Delete the model instance
-        super().delete(*args, **kwargs)
+        result = super().delete(*args, **kwargs)
         
         # Clean up files after successful model deletion
-        for file_path in files_to_delete:
-            if file_path and os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except OSError:
-                    pass
+        delete_files(files_to_delete)
+        return result
@@ -1,20 +1,29 @@
 # backend/core/services/document_service.py
 import os
+import errno
 import logging
-from typing import List, Optional
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, QuerySet
 from django.core.files import File
 from django.contrib.auth.models import User
-from core.models.document import Document
+from celery.result import AsyncResult
+from core.models.document import Document, delete_files
 from core.models.api_response import APIResponse
-from core.services.pdf_service import PDFService
+from core.services.pdf_service import PDFService, evict_pdf, pdf_session
+from core.tasks import QUESTION_BLOCK_PAGES, extract_document_questions, process_document_task
 
 logger = logging.getLogger(__name__)
 
+# Seconds get_document_questions waits for sharded extraction to finish
+QUESTION_RESULT_TIMEOUT = 300
+
 class DocumentService:
     @staticmethod
     def create_document(file, name: str, user: User) -> Document:
-        """Create a new document with initial processing"""
+        """Create a new document and queue it for background processing"""
         try:
             document = Document.objects.create(
                 name=name,
@@ -22,8 +31,9 @@ class DocumentService:
                 user=user
             )
             
-            # Process the uploaded PDF
-            PDFService.process_uploaded_pdf(document)
+            # Process the uploaded PDF on a worker once the row is committed;
+            # the document stays 'pending' until the task finishes
+            transaction.on_commit(lambda: process_document_task.delay(document.id))
             return document
             
         except Exception as e:
@@ -34,10 +44,12 @@ class DocumentService:
     def delete_document_with_files(document: Document) -> None:
         """Delete document and all associated files"""
         try:
-            # Delete associated responses first
-            APIResponse.objects.filter(document=document).delete()
+            # Close the PDF if this call's session has it open; open files
+            # cannot be unlinked on Windows
+            evict_pdf(document.file.path)
             
-            # Document's delete method will handle file deletion
+            # Responses are removed by the FK cascade; Document's delete
+            # method will handle file deletion
             document.delete()
             
         except Exception as e:
@@ -45,31 +57,145 @@ class DocumentService:
             raise
 
     @staticmethod
-    def get_user_documents(user: User) -> List[Document]:
-        """Get all documents for a user"""
-        return Document.objects.filter(user=user).order_by('-uploaded_at')
+    def bulk_delete(documents: List[Document]) -> None:
+        """Delete several documents and remove all their files in one batch"""
+        try:
+            file_paths = [path for document in documents for path in document.file_paths()]
+            for path in file_paths:
+                evict_pdf(path)
+            
+            # QuerySet.delete() skips Document.delete(), so files are handled here
+            Document.objects.filter(pk__in=[document.pk for document in documents]).delete()
+            delete_files(file_paths)
+            
+        except Exception as e:
+            logger.error(f"Error bulk deleting documents: {str(e)}")
+            raise
+
+    @staticmethod
+    def get_user_documents(user: User) -> Iterator[Document]:
+        """Stream all documents for a user in chunks instead of loading them at once"""
+        return Document.objects.filter(user=user).order_by('-uploaded_at').iterator(chunk_size=200)
+
+    @staticmethod
+    def get_user_documents_page(
+        user: User,
+        cursor: Optional[Tuple[datetime, int]] = None,
+        limit: int = 20
+    ) -> List[Document]:
+        """Get a page of a user's documents that come after ``cursor``.
+
+        Keyset pagination: pass ``(uploaded_at, pk)`` of the last document of
+        the previous page as the next cursor. The pk breaks timestamp ties.
+        """
+        documents = Document.objects.filter(user=user)
+        if cursor is not None:
+            uploaded_at, pk = cursor
+            documents = documents.filter(
+                Q(uploaded_at__lt=uploaded_at) | Q(uploaded_at=uploaded_at, pk__lt=pk)
+            )
+        return list(documents.order_by('-uploaded_at', '-pk')[:limit])
+
+    @staticmethod
+    def get_document_responses(document: Document) -> QuerySet:
+        """Get a document's responses with their document and user in one query"""
+        return APIResponse.objects.filter(document=document).select_related(
+            'document', 'user'
+        ).only(
+            'question', 'answer', 'question_id', 'detail_level',
+            'document__name', 'user__username'
+        )
 
     @staticmethod
     def update_document_answers(document: Document, answers_file_path: str) -> None:
         """Update document with generated answers PDF"""
         try:
-            with open(answers_file_path, 'rb') as f:
-                answers_name = f"answers_{document.id}.pdf"
-                document.answers.save(answers_name, File(f), save=True)
+            answers_name = f"answers_{document.id}.pdf"
+            if not DocumentService._move_into_storage(document, answers_file_path, answers_name):
+                # Different filesystem or non-local storage: copy through Django
+                with open(answers_file_path, 'rb') as f:
+                    document.answers.save(answers_name, File(f), save=False)
                 
-            # Clean up temporary file
-            if os.path.exists(answers_file_path):
-                os.remove(answers_file_path)
+                # Clean up temporary file
+                try:
+                    os.unlink(answers_file_path)
+                except FileNotFoundError:
+                    pass
+            document.save(update_fields=['answers', 'updated_at'])
                 
         except Exception as e:
             logger.error(f"Error updating answers for document {document.id}: {str(e)}")
             raise
 
     @staticmethod
-    def get_document_questions(document: Document) -> List[dict]:
-        """Extract questions from document"""
+    def _move_into_storage(document: Document, source_path: str, answers_name: str) -> bool:
+        """Move the answers file into storage without copying its bytes.
+
+        The file is hard-linked under a free storage name and the source is
+        unlinked afterwards. Like Django's own O_EXCL save, linking fails
+        instead of overwriting a name another writer claimed first.
+        Returns False when the file has to be copied instead.
+        """
+        field = document.answers.field
+        storage = field.storage
+        name = field.generate_filename(document, answers_name)
+        while True:
+            name = storage.get_available_name(name)
+            try:
+                target_path = storage.path(name)
+            except NotImplementedError:
+                return False
+            
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            try:
+                os.link(source_path, target_path)
+            except FileExistsError:
+                # Claimed since get_available_name; pick another name
+                continue
+            except OSError as e:
+                # Different filesystem, or one without hard links
+                if e.errno in (errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP):
+                    return False
+                raise
+            break
+        
+        os.unlink(source_path)
+        if storage.file_permissions_mode is not None:
+            os.chmod(target_path, storage.file_permissions_mode)
+        document.answers.name = name
+        return True
+
+    @staticmethod
+    def queue_document_questions(document: Document) -> AsyncResult:
+        """Queue question extraction on the workers without waiting for it.
+
+        The result is a list of questions numbered 1..N in page order; see
+        get_document_questions.
+        """
+        return extract_document_questions(document.file.path)
+
+    @staticmethod
+    def get_document_questions(document: Document, timeout: float = QUESTION_RESULT_TIMEOUT) -> List[dict]:
+        """Extract questions from document.
+
+        PDFs of up to QUESTION_BLOCK_PAGES pages are parsed in-process and
+        keep the question IDs printed in the document. Larger PDFs are parsed
+        as parallel page blocks on the ``pdf_parse`` workers and this call
+        blocks until they finish or ``timeout`` seconds pass (raising
+        celery.exceptions.TimeoutError), e.g. when no worker is running.
+        Their questions are renumbered 1..N in page order, because printed
+        IDs are not unique across blocks. Must not be called from a task;
+        use queue_document_questions to avoid blocking.
+        """
         try:
-            return PDFService.extract_questions(document.file.path)
+            pdf_path = document.file.path
+            # Count pages and extract from the same parsed document
+            with pdf_session():
+                if PDFService.page_count(pdf_path) <= QUESTION_BLOCK_PAGES:
+                    return PDFService.extract_questions(pdf_path)
+            
+            # Very large PDFs are parsed as parallel page blocks on the workers
+            return DocumentService.queue_document_questions(document).get(timeout=timeout)
         except Exception as e:
             logger.error(f"Error extracting questions from document {document.id}: {str(e)}")
             raise
@@ -79,9 +205,12 @@ class DocumentService:
         """Clear generated answers for a document"""
         try:
             if document.answers:
-                document.answers.delete()
-            document.save()
+                document.answers.delete(save=False)
             APIResponse.objects.filter(document=document).delete()
+            
+            # Question IDs restart at 1 once all responses are gone
+            document.next_question_id = 0
+            document.save(update_fields=['answers', 'next_question_id', 'updated_at'])
         except Exception as e:
             logger.error(f"Error clearing answers for document {document.id}: {str(e)}")
             raise
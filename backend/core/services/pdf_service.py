@@ -1,17 +1,223 @@
 # backend/core/services/pdf_service.py
 import fitz  # PyMuPDF
+import os
 import re
+import math
+import mmap
+import atexit
 import logging
-from typing import List, Dict
-from dataclasses import dataclass
+import hashlib
+import threading
+import multiprocessing
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+from django.core.files.base import ContentFile
 
 logger = logging.getLogger(__name__)
 
-@dataclass
-class QuestionMatch:
-    question_id: int
-    question_text: str
-    confidence: float
+# Zoom factor used when rendering the first page as a preview image
+PREVIEW_ZOOM = 1.5
+
+# Minimum pages handed to each worker process; documents too short to give
+# two workers this many pages are extracted in-process
+PAGES_PER_WORKER = 8
+
+# Leading characters of cleaned text hashed to recognise a document template
+TEMPLATE_FINGERPRINT_CHARS = 1024
+
+class _MappedPDF:
+    """An open document parsed straight from a read-only mmap of its file"""
+
+    def __init__(self, pdf_path: str):
+        with open(pdf_path, 'rb') as f:
+            self.mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mapped)
+        self.doc = fitz.open(stream=self.view, filetype="pdf")
+
+    def close(self) -> None:
+        # The document reads from the mapping, so it goes first
+        self.doc.close()
+        self.view.release()
+        self.mapped.close()
+
+# Documents shared by open_pdf calls inside the current thread's pdf_session(),
+# keyed by (path, st_mtime_ns); None outside a session
+_session = threading.local()
+
+@contextmanager
+def pdf_session() -> Iterator[None]:
+    """Share opened PDFs between open_pdf calls made inside the block.
+
+    Used around a single task or service call, e.g. so the page count and
+    the question extraction of one document parse it only once. Every
+    document opened in the session is closed when the block exits, so no
+    mapping outlives the call that needed it. Nested sessions join the
+    outer one.
+    """
+    if getattr(_session, 'documents', None) is not None:
+        yield
+        return
+    
+    _session.documents = {}
+    try:
+        yield
+    finally:
+        documents, _session.documents = _session.documents, None
+        for entry in documents.values():
+            entry.close()
+
+@contextmanager
+def open_pdf(pdf_path: str) -> Iterator[fitz.Document]:
+    """Open a PDF from a read-only mmap of its file.
+
+    Inside a pdf_session() the parsed document is reused while the file is
+    unchanged and closed when the session ends; otherwise it is closed when
+    the ``with`` block exits. Either way it must not be kept beyond it.
+    """
+    documents = getattr(_session, 'documents', None)
+    if documents is None:
+        entry = _MappedPDF(pdf_path)
+        try:
+            yield entry.doc
+        finally:
+            entry.close()
+        return
+    
+    key = (pdf_path, os.stat(pdf_path).st_mtime_ns)
+    entry = documents.get(key)
+    if entry is None:
+        entry = documents[key] = _MappedPDF(pdf_path)
+    yield entry.doc
+
+def evict_pdf(pdf_path: str) -> None:
+    """Close the current session's copies of a PDF, e.g. before deleting its file"""
+    documents = getattr(_session, 'documents', None)
+    if not documents:
+        return
+    for key in [key for key in documents if key[0] == pdf_path]:
+        documents.pop(key).close()
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> str:
+    """Extract text for pages [start, end); runs in a worker process"""
+    # Pool workers run outside any pdf_session(), so the document is closed on return
+    with open_pdf(pdf_path) as doc:
+        return "\n".join(doc[page_no].get_text("text") for page_no in range(start, end))
+
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    """Return the process pool shared by all page extractions"""
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            # Spawn fresh interpreters rather than forking a multithreaded
+            # web or Celery worker along with its locks and open documents
+            _page_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _page_pool
+
+def _reset_page_pool() -> None:
+    global _page_pool
+    with _page_pool_lock:
+        pool, _page_pool = _page_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+atexit.register(_reset_page_pool)
+
+def _branch_patterns(patterns: List[str]) -> List[str]:
+    """Rewrite question patterns so they can share one alternation.
+
+    Each branch is wrapped in a ``p<index>`` group and its named groups are
+    suffixed with the branch index (``id0``, ``text0``, ...) to keep them unique.
+    """
+    branches = []
+    for index, pattern in enumerate(patterns):
+        pattern = re.sub(r'\(\?P<(\w+)>', lambda m: f'(?P<{m.group(1)}{index}>', pattern)
+        branches.append(f'(?P<p{index}>{pattern})')
+    return branches
+
+def _combine_patterns(patterns: List[str]) -> re.Pattern:
+    """Merge question patterns into one alternation so the text is scanned once"""
+    return re.compile('|'.join(_branch_patterns(patterns)), re.MULTILINE | re.DOTALL)
+
+def _other_heads_patterns(patterns: List[str]) -> List[re.Pattern]:
+    """Build, per branch, a probe matching the line-start head of any other branch.
+
+    A pattern's head is everything before its ``text`` group. Every pattern
+    matches exactly where its head does, so a text with no other-branch
+    heads gives the same result when scanned with that branch alone.
+    The shared ``(?:^|\n)`` prefix is hoisted into one multiline ``^`` so
+    the probe only tries the heads at line starts.
+    """
+    line_start = r'(?:^|\n)'
+    heads = [
+        re.sub(r'\(\?P<\w+>', '(?:', pattern[len(line_start):pattern.index('(?P<text>')])
+        for pattern in patterns
+    ]
+    return [
+        re.compile(
+            '^(?:' + '|'.join(head for other, head in enumerate(heads) if other != index) + ')',
+            re.MULTILINE
+        )
+        for index in range(len(heads))
+    ]
+
+def _build_clean_pattern(noise_patterns: List[str]) -> re.Pattern:
+    """Combine noise removal and text normalization into one alternation.
+
+    Branches are tried in order at each position: noise (case-insensitive),
+    question marker normalization, whitespace runs and unwanted characters.
+    """
+    noise = '(?i:' + '|'.join(noise_patterns) + ')'
+    return re.compile(
+        rf'(?P<noise>{noise})'
+        rf'|(?P<q_marker>Q\s*\.(?:\s|{noise})*)'
+        r'|(?P<question_marker>Question\s+)'
+        r'|(?P<ws>\s+)'
+        r'|(?P<unwanted>[^\w\s\n.?,:;()\[\]-])'
+    )
+
+class TemplateRegistry:
+    """Remembers which question pattern fits a recurring document template.
+
+    Templates are keyed by a SHA-1 of the leading cleaned text, so repeat
+    uploads of the same exam layout can be scanned with a single pattern.
+    The cached pattern is only used when the text has no question heads of
+    any other format, so results never depend on what was cached.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._branches = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(text: str) -> str:
+        return hashlib.sha1(text[:TEMPLATE_FINGERPRINT_CHARS].encode('utf-8')).hexdigest()
+
+    def get(self, fingerprint: str) -> Optional[int]:
+        with self._lock:
+            branch = self._branches.get(fingerprint)
+            if branch is not None:
+                self._branches.move_to_end(fingerprint)
+            return branch
+
+    def record(self, fingerprint: str, branch: int) -> None:
+        with self._lock:
+            self._branches[fingerprint] = branch
+            self._branches.move_to_end(fingerprint)
+            if len(self._branches) > self.maxsize:
+                self._branches.popitem(last=False)
+
+template_registry = TemplateRegistry()
 
 class QuestionExtractor:
     """Enhanced question extraction with multiple pattern matching strategies"""
@@ -43,6 +249,15 @@ class QuestionExtractor:
         r'know if you need any changes.*'
     ]
 
+    _COMBINED_PATTERN = _combine_patterns(PATTERNS)
+    _BRANCH_PATTERNS = [
+        re.compile(pattern, re.MULTILINE | re.DOTALL)
+        for pattern in _branch_patterns(PATTERNS)
+    ]
+    _OTHER_HEADS_PATTERNS = _other_heads_patterns(PATTERNS)
+    _CLEAN_PATTERN = _build_clean_pattern(NOISE_PATTERNS)
+    _WHITESPACE_RE = re.compile(r'\s+')
+
     @staticmethod
     def extract_questions(pdf_path: str) -> List[Dict[str, str]]:
         """Main entry point for question extraction"""
@@ -65,125 +280,191 @@ class QuestionExtractor:
             logger.error(f"Question extraction failed: {str(e)}")
             raise
 
+    @staticmethod
+    def extract_block(pdf_path: str, start: int, end: int) -> List[Dict[str, str]]:
+        """Extract questions from pages [start, end) of a PDF"""
+        text = _extract_page_range(pdf_path, start, end)
+        cleaned_text = QuestionExtractor._clean_text(text)
+        questions = QuestionExtractor._extract_with_confidence(cleaned_text)
+        return QuestionExtractor._post_process_questions(questions)
+
     @staticmethod
     def _extract_text_blocks(pdf_path: str) -> str:
         """Extract text while preserving structure"""
-        doc = fitz.open(pdf_path)
-        text_blocks = []
+        with open_pdf(pdf_path) as doc:
+            page_count = doc.page_count
+            workers = min(os.cpu_count() or 1, page_count // PAGES_PER_WORKER)
+            if workers < 2:
+                # Let MuPDF assemble each page's text natively, keeping line breaks
+                return "\n".join(page.get_text("text") for page in doc)
         
-        for page in doc:
-            # Get blocks with their bounding boxes and text
-            blocks = page.get_text("dict")["blocks"]
-            
-            for block in blocks:
-                if "lines" in block:
-                    for line in block["lines"]:
-                        for span in line["spans"]:
-                            text_blocks.append(span["text"])
-                            
-                            # Preserve natural line breaks
-                            if span.get("flags", 0) & 2**0:  # Check for hardline break
-                                text_blocks.append("\n")
-        
-        return " ".join(text_blocks)
+        # Split pages into one contiguous batch per worker, each opening its own document
+        batch_size = math.ceil(page_count / workers)
+        ranges = [
+            (start, min(start + batch_size, page_count))
+            for start in range(0, page_count, batch_size)
+        ]
+        
+        try:
+            text_blocks = _get_page_pool().map(
+                _extract_page_range,
+                [pdf_path] * len(ranges),
+                [start for start, _ in ranges],
+                [end for _, end in ranges]
+            )
+            # map() yields results in submission order, so pages stay in sequence
+            return "\n".join(text_blocks)
+        except BrokenProcessPool:
+            logger.warning("Page extraction pool broke; extracting in-process")
+            _reset_page_pool()
+            return _extract_page_range(pdf_path, 0, page_count)
 
     @staticmethod
     def _clean_text(text: str) -> str:
         """Enhanced text cleaning with noise removal"""
-        # Remove noise patterns
-        for pattern in QuestionExtractor.NOISE_PATTERNS:
-            text = re.sub(pattern, '', text, flags=re.IGNORECASE)
+        # End offset of the previous match and whether the output there ends
+        # in a space, so whitespace around removed noise collapses to one space
+        state = {'end': -1, 'space': False}
         
-        # Normalize whitespace
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'\n\s*\n', '\n', text)
+        def replace(match: re.Match) -> str:
+            if match.start() != state['end']:
+                state['space'] = False
+            state['end'] = match.end()
+            kind = match.lastgroup
+            
+            if kind == 'noise':
+                return ''
+            if kind == 'ws':
+                if state['space']:
+                    return ''
+                state['space'] = True
+                return ' '
+            if kind == 'q_marker':
+                state['space'] = False
+                return 'Q.'
+            if kind == 'question_marker':
+                state['space'] = True
+                return 'Question '
+            
+            # Unwanted characters are dropped after whitespace normalization,
+            # so the spaces on either side of them are kept
+            state['space'] = False
+            return ''
         
-        # Normalize question markers
-        text = re.sub(r'Q\s*\.\s*', 'Q.', text)
-        text = re.sub(r'Question\s+', 'Question ', text)
+        return QuestionExtractor._CLEAN_PATTERN.sub(replace, text).strip()
+
+    @staticmethod
+    def _extract_with_confidence(text: str) -> Iterator[Tuple[int, str]]:
+        """Yield (question_id, cleaned_text) for confident matches in ID order"""
+        # Patterns only match at the start of the text or of a line. Without
+        # newlines (the case for cleaned text) at most one branch can match,
+        # at position 0, so one scan of the combined alternation finds it
+        if '\n' not in text:
+            selected = QuestionExtractor._select_matches(
+                text, [QuestionExtractor._COMBINED_PATTERN]
+            )
+        else:
+            selected = QuestionExtractor._select_line_matches(text)
         
-        # Remove unwanted characters while preserving essential punctuation
-        text = re.sub(r'[^\w\s\n.?,:;()\[\]-]', '', text)
+        for q_id, _, q_text in selected:
+            yield q_id, QuestionExtractor._final_clean(q_text)
+
+    @staticmethod
+    def _select_line_matches(text: str) -> List[Tuple[int, int, str]]:
+        """Select matches in text with line breaks.
+
+        A match from one branch can cover lines another branch would match,
+        so each pattern is scanned on its own. Known templates are scanned
+        with only the pattern that matched them before, after a line-start
+        probe confirms the text has no question heads of another format.
+        """
+        fingerprint = TemplateRegistry.fingerprint(text)
+        branch = template_registry.get(fingerprint)
+        if branch is not None and not QuestionExtractor._OTHER_HEADS_PATTERNS[branch].search(text):
+            selected = QuestionExtractor._select_matches(
+                text, [QuestionExtractor._BRANCH_PATTERNS[branch]]
+            )
+            if selected:
+                return selected
         
-        return text.strip()
+        selected = QuestionExtractor._select_matches(text, QuestionExtractor._BRANCH_PATTERNS)
+        # Only specialize templates whose questions all use one pattern
+        branches = {branch for _, branch, _ in selected}
+        if len(branches) == 1:
+            template_registry.record(fingerprint, branches.pop())
+        return selected
 
     @staticmethod
-    def _extract_with_confidence(text: str) -> List[QuestionMatch]:
-        """Extract questions with confidence scoring"""
-        question_matches = []
-        seen_questions = set()
+    def _select_matches(text: str, patterns: List[re.Pattern]) -> List[Tuple[int, int, str]]:
+        """Return (question_id, branch, text) of the best match per ID, in ID order"""
+        # IDs come from an unbounded \d+, so keep them as Python ints
+        ids = []
+        branches = array('b')
+        texts = []
+        has_markers = []
         
-        for pattern in QuestionExtractor.PATTERNS:
-            matches = re.finditer(pattern, text, re.MULTILINE | re.DOTALL)
-            
-            for match in matches:
-                q_id = int(match.group('id'))
-                q_text = match.group('text').strip()
-                
-                # Skip if we've seen this question ID with better confidence
-                if q_id in seen_questions:
-                    continue
-                
-                # Calculate confidence based on various factors
-                confidence = QuestionExtractor._calculate_confidence(q_text, match)
-                
-                if confidence > 0.5:  # Minimum confidence threshold
-                    question_matches.append(QuestionMatch(
-                        question_id=q_id,
-                        question_text=q_text,
-                        confidence=confidence
-                    ))
-                    seen_questions.add(q_id)
-        
-        return sorted(question_matches, key=lambda x: x.question_id)
+        # Collect every candidate match
+        for match in (match for pattern in patterns for match in pattern.finditer(text)):
+            branch = int(match.lastgroup[1:])
+            ids.append(int(match.group(f'id{branch}')))
+            branches.append(branch)
+            texts.append(match.group(f'text{branch}').strip())
+            has_markers.append(bool(match.groupdict().get(f'marker{branch}')))
+        
+        # Score all candidates in one batch
+        confidences = QuestionExtractor._calculate_confidences(texts, has_markers)
+        
+        # Keep the first confident match per question ID from the most
+        # preferred pattern; the branch index is the pattern priority
+        slots = {}
+        for index, (q_id, branch, confidence) in enumerate(zip(ids, branches, confidences)):
+            if confidence <= 0.5:  # Minimum confidence threshold
+                continue
+            previous = slots.get(q_id)
+            if previous is None or branches[previous] > branch:
+                slots[q_id] = index
+        
+        return [
+            (ids[index], branches[index], texts[index])
+            for index in sorted(slots.values(), key=ids.__getitem__)
+        ]
 
     @staticmethod
-    def _calculate_confidence(text: str, match: re.Match) -> float:
-        """Calculate confidence score for a question match"""
-        confidence = 1.0
-        
-        # Length-based confidence
-        if len(text) < 10:
-            confidence *= 0.5
-        elif len(text) > 500:
-            confidence *= 0.8
-            
-        # Pattern-based confidence
-        if match.group('marker'):
-            confidence *= 1.2
+    def _calculate_confidences(texts: List[str], has_markers: List[bool]) -> array:
+        """Calculate confidence scores for a batch of question matches"""
+        confidences = array('f')
+        
+        for text, has_marker in zip(texts, has_markers):
+            # Length-based confidence
+            length = len(text)
+            confidence = 0.5 if length < 10 else 0.8 if length > 500 else 1.0
             
-        # Question mark presence
-        if '?' in text:
-            confidence *= 1.1
+            # Pattern-based confidence
+            if has_marker:
+                confidence *= 1.2
             
-        # Structural indicators
-        if re.search(r'^[A-Z]', text):  # Starts with capital letter
-            confidence
+            # Question mark presence
+            if '?' in text:
+                confidence *= 1.1
             
-        return min(confidence, 1.0)  # Cap at 1.0
+            confidences.append(min(confidence, 1.0))  # Cap at 1.0
+        
+        return confidences
 
     @staticmethod
-    def _post_process_questions(matches: List[QuestionMatch]) -> List[Dict[str, str]]:
-        """Convert matches to final format with validation"""
-        processed_questions = []
-        
-        for match in matches:
-            # Final cleaning of question text
-            cleaned_text = QuestionExtractor._final_clean(match.question_text)
-            
-            if cleaned_text:  # Only include non-empty questions
-                processed_questions.append({
-                    'question_id': match.question_id,
-                    'question': cleaned_text
-                })
-        
-        return processed_questions
+    def _post_process_questions(matches: Iterable[Tuple[int, str]]) -> List[Dict[str, str]]:
+        """Convert matches to final format, dropping empty questions"""
+        return [
+            {'question_id': q_id, 'question': q_text}
+            for q_id, q_text in matches
+            if q_text
+        ]
 
     @staticmethod
     def _final_clean(text: str) -> str:
         """Final cleaning pass for question text"""
         # Remove any remaining noise
-        text = re.sub(r'\s+', ' ', text)
+        text = QuestionExtractor._WHITESPACE_RE.sub(' ', text)
         text = text.strip()
         
         # Ensure proper ending punctuation
@@ -191,3 +472,39 @@ class QuestionExtractor:
             text += '.'
             
         return text
+
+
+class PDFService:
+    """Document-level PDF operations used by the service layer and workers"""
+
+    extract_questions = staticmethod(QuestionExtractor.extract_questions)
+
+    @staticmethod
+    def page_count(pdf_path: str) -> int:
+        """Return the number of pages in a PDF"""
+        with open_pdf(pdf_path) as doc:
+            return doc.page_count
+
+    @staticmethod
+    def process_uploaded_pdf(document) -> None:
+        """Render the preview image and mark the document as processed"""
+        try:
+            with open_pdf(document.file.path) as doc:
+                pixmap = doc[0].get_pixmap(matrix=fitz.Matrix(PREVIEW_ZOOM, PREVIEW_ZOOM))
+                preview_bytes = pixmap.tobytes("png")
+            
+            document.preview.save(
+                f"preview_{document.id}.png",
+                ContentFile(preview_bytes),
+                save=False
+            )
+            document.status = 'processed'
+            document.processing_error = None
+            document.save(update_fields=['preview', 'status', 'processing_error', 'updated_at'])
+            
+        except Exception as e:
+            logger.error(f"Processing failed for document {document.id}: {str(e)}")
+            document.status = 'failed'
+            document.processing_error = str(e)
+            document.save(update_fields=['status', 'processing_error', 'updated_at'])
+            raise
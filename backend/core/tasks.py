@@ -0,0 +1,52 @@
+# backend/core/tasks.py
+import logging
+from typing import List, Dict
+from celery import chord, shared_task
+from celery.result import AsyncResult
+from core.models.document import Document
+from core.services.pdf_service import PDFService, QuestionExtractor, pdf_session
+
+logger = logging.getLogger(__name__)
+
+# Pages parsed by a single extract_questions_block task
+QUESTION_BLOCK_PAGES = 300
+
+@shared_task
+def process_document_task(document_id: int) -> None:
+    """Process an uploaded PDF outside the request cycle"""
+    try:
+        document = Document.objects.get(pk=document_id)
+    except Document.DoesNotExist:
+        logger.warning(f"Document {document_id} was deleted before processing")
+        return
+
+    # Documents opened by the task are closed when it finishes, so the
+    # long-lived worker keeps no mapping of files that may be deleted
+    with pdf_session():
+        PDFService.process_uploaded_pdf(document)
+
+@shared_task
+def extract_questions_block(pdf_path: str, start: int, end: int) -> List[str]:
+    """Extract question texts from pages [start, end) of a PDF"""
+    return [
+        question['question']
+        for question in QuestionExtractor.extract_block(pdf_path, start, end)
+    ]
+
+@shared_task
+def merge_matches(blocks: List[List[str]]) -> List[Dict[str, str]]:
+    """Merge per-block questions in page order and renumber them sequentially"""
+    question_texts = (text for block in blocks for text in block)
+    return QuestionExtractor._post_process_questions(enumerate(question_texts, start=1))
+
+def extract_document_questions(pdf_path: str) -> AsyncResult:
+    """Queue question extraction, sharding large PDFs into parallel page blocks.
+
+    Questions are renumbered 1..N in page order by merge_matches.
+    """
+    page_count = PDFService.page_count(pdf_path)
+    blocks = [
+        extract_questions_block.s(pdf_path, start, min(start + QUESTION_BLOCK_PAGES, page_count))
+        for start in range(0, page_count, QUESTION_BLOCK_PAGES)
+    ]
+    return chord(blocks)(merge_matches.s())
@@ -0,0 +1,57 @@
+# backend/core/tests/test_models/test_api_response.py
+import os
+import tempfile
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from core.models.api_response import APIResponse
+from core.models.document import Document
+
+
+class QuestionIdReservationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        # bulk_create skips Document.save, which would stat the missing file
+        self.document = Document.objects.bulk_create([
+            Document(name='doc.pdf', file='documents/doc.pdf', user=self.user)
+        ])[0]
+
+    def create_response(self, question):
+        return APIResponse.objects.create(question=question, document=self.document, user=self.user)
+
+    def test_save_assigns_sequential_ids(self):
+        ids = [self.create_response(f'Q{i}').question_id for i in range(3)]
+        self.assertEqual(ids, [1, 2, 3])
+        self.document.refresh_from_db()
+        self.assertEqual(self.document.next_question_id, 3)
+
+    def test_bulk_create_continues_after_saved_responses(self):
+        self.create_response('First')
+        responses = APIResponse.bulk_create_for_document(
+            self.document, [{'question': 'Second'}, {'question': 'Third'}]
+        )
+        self.assertEqual([response.question_id for response in responses], [2, 3])
+        self.assertEqual(
+            list(APIResponse.objects.values_list('question_id', flat=True)), [1, 2, 3]
+        )
+
+    def test_bulk_create_rejects_assigned_fields(self):
+        for field in ('document', 'document_id', 'question_id'):
+            with self.subTest(field=field):
+                with self.assertRaises(ValueError):
+                    APIResponse.bulk_create_for_document(
+                        self.document, [{'question': 'Why?', field: 1}]
+                    )
+        self.assertFalse(APIResponse.objects.exists())
+        self.document.refresh_from_db()
+        self.assertEqual(self.document.next_question_id, 0)
+
+    def test_stale_document_save_keeps_counter(self):
+        stale = Document.objects.get(pk=self.document.pk)
+        self.create_response('First')
+        stale.name = 'renamed.pdf'
+        # A full save refreshes file_size, so the file has to exist
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            os.makedirs(os.path.join(media_root, 'documents'))
+            open(os.path.join(media_root, 'documents', 'doc.pdf'), 'wb').close()
+            stale.save()
+        self.assertEqual(self.create_response('Second').question_id, 2)
@@ -0,0 +1,96 @@
+# backend/core/tests/test_models/test_document.py
+import os
+import tempfile
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from core.models import document as document_module
+from core.models.document import Document, delete_files
+
+
+class DeleteFilesTest(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def make_files(self, directory, count):
+        path = os.path.join(self.tmpdir.name, directory)
+        os.makedirs(path)
+        paths = [os.path.join(path, f'file{i}.pdf') for i in range(count)]
+        for file_path in paths:
+            open(file_path, 'wb').close()
+        return paths
+
+    def test_removes_files_and_ignores_missing(self):
+        paths = self.make_files('documents', 1) + self.make_files('answers', 3)
+        missing = os.path.join(self.tmpdir.name, 'previews', 'missing.png')
+
+        delete_files(paths + [None, missing])
+
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+    def test_directory_fd_only_for_shared_directories(self):
+        single = self.make_files('documents', 1)
+        shared = self.make_files('answers', 2)
+
+        with mock.patch.object(document_module.os, 'open', wraps=os.open) as os_open:
+            delete_files(single + shared)
+
+        opened = [call.args[0] for call in os_open.call_args_list]
+        expected = [os.path.dirname(shared[0])] if document_module._UNLINK_DIR_FD else []
+        self.assertEqual(opened, expected)
+        self.assertFalse(any(os.path.exists(path) for path in single + shared))
+
+    def test_large_batches_use_thread_pool(self):
+        paths = self.make_files('documents', document_module.DELETE_POOL_MIN_FILES)
+
+        with mock.patch.object(
+            document_module, 'ThreadPoolExecutor', wraps=document_module.ThreadPoolExecutor
+        ) as executor:
+            delete_files(paths)
+
+        executor.assert_called_once()
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+
+class DocumentSaveTest(TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=tmpdir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # A full save refreshes file_size, so the file has to exist
+        os.makedirs(os.path.join(tmpdir.name, 'documents'))
+        with open(os.path.join(tmpdir.name, 'documents', 'doc.pdf'), 'wb') as f:
+            f.write(b'%PDF')
+
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.document = Document.objects.create(name='doc.pdf', file='documents/doc.pdf', user=user)
+
+    def test_full_save_keeps_question_counter(self):
+        Document.objects.filter(pk=self.document.pk).update(next_question_id=5)
+        self.document.name = 'renamed.pdf'
+        self.document.save()
+
+        self.document.refresh_from_db()
+        self.assertEqual(self.document.name, 'renamed.pdf')
+        self.assertEqual(self.document.next_question_id, 5)
+        self.assertEqual(self.document.file_size, 4)
+
+    def test_deferred_save_updates_loaded_fields_only(self):
+        document = Document.objects.only('name', 'file').get(pk=self.document.pk)
+        document.name = 'renamed.pdf'
+        with self.assertNumQueries(1) as queries:
+            document.save()
+
+        update = queries.captured_queries[0]['sql']
+        self.assertIn('"name"', update)
+        self.assertNotIn('"status"', update)
+
+    def test_force_insert_copies_loaded_document(self):
+        document = Document.objects.get(pk=self.document.pk)
+        document.pk = None
+        document.save(force_insert=True)
+
+        self.assertEqual(Document.objects.count(), 2)
@@ -0,0 +1,214 @@
+# backend/core/tests/test_services/test_document_service.py
+import errno
+import os
+import stat
+import tempfile
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from core.models.api_response import APIResponse
+from core.models.document import Document
+from core.services.document_service import DocumentService, QUESTION_RESULT_TIMEOUT
+from core.tasks import QUESTION_BLOCK_PAGES
+
+
+class CreateDocumentTest(TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=tmpdir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+
+    @mock.patch('core.services.document_service.process_document_task')
+    def test_queues_processing_after_commit(self, process_document_task):
+        upload = SimpleUploadedFile('assignment.pdf', b'%PDF-1.4')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            document = DocumentService.create_document(upload, 'assignment.pdf', self.user)
+            # Nothing is queued while the row is still uncommitted
+            process_document_task.delay.assert_not_called()
+
+        self.assertEqual(len(callbacks), 1)
+        process_document_task.delay.assert_called_once_with(document.id)
+        document.refresh_from_db()
+        self.assertEqual(document.status, 'pending')
+        self.assertEqual(document.file_size, len(b'%PDF-1.4'))
+
+
+class BulkDeleteTest(TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=tmpdir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for directory in ('documents', 'answers', 'previews'):
+            os.makedirs(os.path.join(tmpdir.name, directory))
+
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.documents = Document.objects.bulk_create([
+            Document(
+                name=f'doc{i}.pdf',
+                file=f'documents/doc{i}.pdf',
+                answers=f'answers/answers_{i}.pdf',
+                preview=f'previews/preview_{i}.png',
+                user=user
+            )
+            for i in range(3)
+        ])
+        for document in self.documents:
+            for path in document.file_paths():
+                open(path, 'wb').close()
+            APIResponse.bulk_create_for_document(document, [{'question': 'Why?'}])
+
+    def test_deletes_rows_responses_and_files(self):
+        deleted, kept = self.documents[:2], self.documents[2]
+
+        DocumentService.bulk_delete(deleted)
+
+        self.assertEqual(list(Document.objects.values_list('pk', flat=True)), [kept.pk])
+        self.assertEqual(
+            list(APIResponse.objects.values_list('document_id', flat=True)), [kept.pk]
+        )
+        for document in deleted:
+            for path in document.file_paths():
+                self.assertFalse(os.path.exists(path))
+        self.assertTrue(all(os.path.exists(path) for path in kept.file_paths()))
+
+
+class GetDocumentQuestionsTest(SimpleTestCase):
+    def setUp(self):
+        self.document = mock.Mock(id=1)
+        self.document.file.path = '/tmp/assignment.pdf'
+
+    @mock.patch('core.services.document_service.extract_document_questions')
+    @mock.patch('core.services.document_service.PDFService')
+    def test_small_pdf_extracts_in_process(self, pdf_service, extract_document_questions):
+        pdf_service.page_count.return_value = QUESTION_BLOCK_PAGES
+        pdf_service.extract_questions.return_value = [{'question_id': 1, 'question': 'Why?'}]
+
+        questions = DocumentService.get_document_questions(self.document)
+
+        self.assertEqual(questions, [{'question_id': 1, 'question': 'Why?'}])
+        extract_document_questions.assert_not_called()
+
+    @mock.patch('core.services.document_service.extract_document_questions')
+    @mock.patch('core.services.document_service.PDFService')
+    def test_large_pdf_uses_sharded_tasks(self, pdf_service, extract_document_questions):
+        pdf_service.page_count.return_value = QUESTION_BLOCK_PAGES + 1
+        extract_document_questions.return_value.get.return_value = [{'question_id': 1, 'question': 'Why?'}]
+
+        questions = DocumentService.get_document_questions(self.document)
+
+        self.assertEqual(questions, [{'question_id': 1, 'question': 'Why?'}])
+        extract_document_questions.assert_called_once_with('/tmp/assignment.pdf')
+        extract_document_questions.return_value.get.assert_called_once_with(
+            timeout=QUESTION_RESULT_TIMEOUT
+        )
+        pdf_service.extract_questions.assert_not_called()
+
+
+class GetUserDocumentsPageTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        # bulk_create skips Document.save, which would stat the missing files
+        Document.objects.bulk_create([
+            Document(name=f'doc{i}.pdf', file=f'documents/doc{i}.pdf', user=self.user)
+            for i in range(5)
+        ])
+        # All uploads share one timestamp, so only the pk orders them
+        Document.objects.update(uploaded_at=timezone.now())
+
+    def test_pages_cover_tied_timestamps(self):
+        seen = []
+        cursor = None
+        while True:
+            page = DocumentService.get_user_documents_page(self.user, cursor, limit=2)
+            if not page:
+                break
+            seen.extend(document.pk for document in page)
+            cursor = (page[-1].uploaded_at, page[-1].pk)
+
+        expected = list(Document.objects.order_by('-pk').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+
+class GetDocumentResponsesTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        # bulk_create skips Document.save, which would stat the missing file
+        self.document = Document.objects.bulk_create([
+            Document(name='doc.pdf', file='documents/doc.pdf', user=user)
+        ])[0]
+        APIResponse.bulk_create_for_document(
+            self.document, [{'question': 'What is a stack?'}, {'question': 'What is a queue?'}]
+        )
+
+    def test_loads_document_and_user_in_one_query(self):
+        with self.assertNumQueries(1):
+            rows = [
+                (response.question_id, response.document.name, response.user.username)
+                for response in DocumentService.get_document_responses(self.document)
+            ]
+
+        self.assertEqual(rows, [(1, 'doc.pdf', 'testuser'), (2, 'doc.pdf', 'testuser')])
+
+
+class UpdateDocumentAnswersTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        media_root = os.path.join(self.tmpdir.name, 'media')
+        settings_override = override_settings(MEDIA_ROOT=media_root, FILE_UPLOAD_PERMISSIONS=0o640)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.document = Document.objects.bulk_create([
+            Document(name='doc.pdf', file='documents/doc.pdf', user=user)
+        ])[0]
+        self.answers_path = os.path.join(self.tmpdir.name, 'generated.pdf')
+        with open(self.answers_path, 'wb') as f:
+            f.write(b'answers')
+
+    def test_moves_file_with_storage_permissions(self):
+        DocumentService.update_document_answers(self.document, self.answers_path)
+
+        self.assertFalse(os.path.exists(self.answers_path))
+        target_path = self.document.answers.path
+        with open(target_path, 'rb') as f:
+            self.assertEqual(f.read(), b'answers')
+        self.assertEqual(stat.S_IMODE(os.stat(target_path).st_mode), 0o640)
+
+    def test_does_not_overwrite_name_claimed_concurrently(self):
+        claimed = 'answers/claimed.pdf'
+        os.makedirs(os.path.join(default_storage.location, 'answers'))
+        with open(default_storage.path(claimed), 'wb') as f:
+            f.write(b'other writer')
+        get_available_name = default_storage.get_available_name
+        names = iter([claimed])
+
+        def racy_available_name(name, *args, **kwargs):
+            # First answer a name another writer has already taken
+            return next(names, None) or get_available_name(name, *args, **kwargs)
+
+        with mock.patch.object(default_storage, 'get_available_name', side_effect=racy_available_name):
+            DocumentService.update_document_answers(self.document, self.answers_path)
+
+        with open(default_storage.path(claimed), 'rb') as f:
+            self.assertEqual(f.read(), b'other writer')
+        self.assertNotEqual(self.document.answers.name, claimed)
+        with open(self.document.answers.path, 'rb') as f:
+            self.assertEqual(f.read(), b'answers')
+
+    def test_copies_across_filesystems(self):
+        with mock.patch('core.services.document_service.os.link', side_effect=OSError(errno.EXDEV, 'cross-device')):
+            DocumentService.update_document_answers(self.document, self.answers_path)
+
+        self.assertFalse(os.path.exists(self.answers_path))
+        with open(self.document.answers.path, 'rb') as f:
+            self.assertEqual(f.read(), b'answers')
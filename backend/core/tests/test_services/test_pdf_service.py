@@ -1,10 +1,17 @@
 # backend/core/tests/test_pdf_service.py
 import os
-from django.test import TestCase
-from django.core.files.uploadedfile import SimpleUploadedFile
+import tempfile
+from unittest import mock, skipUnless
+import fitz
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.core.files import File
+from django.core.files.base import ContentFile
 from django.contrib.auth.models import User
 from core.models.document import Document
-from core.services.pdf_service import PDFService
+from core.services import pdf_service
+from core.services.pdf_service import (
+    PDFService, QuestionExtractor, PAGES_PER_WORKER, open_pdf, evict_pdf, pdf_session
+)
 from django.conf import settings
 
 class PDFServiceTest(TestCase):
@@ -15,11 +22,22 @@ class PDFServiceTest(TestCase):
             password='testpass123'
         )
         
-        # Create a test document using your existing PDF file
-        with open('C:\Users\nanda\Downloads\ASSIGNMENT-2 (1).pdf', 'rb') as f:
+        # Keep uploads out of the real media directory
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=os.path.join(self.tmpdir.name, 'media'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        # Create a test document from a generated PDF
+        pdf_path = os.path.join(self.tmpdir.name, 'assignment.pdf')
+        make_pdf(pdf_path, ['Q1. What is a stack?'])
+        
+        # Stream the file into storage instead of reading it into memory
+        with open(pdf_path, 'rb') as f:
             self.document = Document.objects.create(
                 name='test.pdf',
-                file=SimpleUploadedFile('test.pdf', f.read()),
+                file=File(f, name='test.pdf'),
                 user=self.user
             )
 
@@ -44,3 +62,133 @@ class PDFServiceTest(TestCase):
         if questions:  # If questions were found
             self.assertIn('question_id', questions[0])
             self.assertIn('question', questions[0])
+
+
+def make_pdf(path, pages):
+    """Write a PDF with one line of text per page"""
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(path)
+    doc.close()
+
+
+class ProcessUploadedPDFTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=self.tmpdir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+
+    def create_document(self, content):
+        return Document.objects.create(
+            name='assignment.pdf',
+            file=ContentFile(content, name='assignment.pdf'),
+            user=self.user
+        )
+
+    def test_marks_document_processed(self):
+        pdf_path = os.path.join(self.tmpdir.name, 'source.pdf')
+        make_pdf(pdf_path, ['Q1. What is a stack?'])
+        with open(pdf_path, 'rb') as f:
+            document = self.create_document(f.read())
+        self.assertEqual(document.status, 'pending')
+
+        PDFService.process_uploaded_pdf(document)
+
+        document.refresh_from_db()
+        self.assertEqual(document.status, 'processed')
+        self.assertIsNone(document.processing_error)
+        self.assertTrue(os.path.exists(document.preview.path))
+
+    def test_marks_document_failed(self):
+        document = self.create_document(b'not a pdf')
+
+        with self.assertLogs('core.services.pdf_service', 'ERROR'), self.assertRaises(fitz.FileDataError):
+            PDFService.process_uploaded_pdf(document)
+
+        document.refresh_from_db()
+        self.assertEqual(document.status, 'failed')
+        self.assertTrue(document.processing_error)
+        self.assertFalse(document.preview)
+
+
+class PDFSessionTest(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.pdf_path = os.path.join(self.tmpdir.name, 'assignment.pdf')
+        make_pdf(self.pdf_path, ['Q1. What is a stack?'])
+
+    def test_closes_document_outside_session(self):
+        with open_pdf(self.pdf_path) as doc:
+            self.assertIn('What is a stack?', doc[0].get_text())
+        self.assertTrue(doc.is_closed)
+
+    def test_session_reuses_then_closes_document(self):
+        with pdf_session():
+            with open_pdf(self.pdf_path) as first:
+                pass
+            with pdf_session(), open_pdf(self.pdf_path) as second:
+                self.assertIs(first, second)
+            self.assertFalse(second.is_closed)
+        self.assertTrue(first.is_closed)
+
+    def test_evict_closes_session_document(self):
+        with pdf_session():
+            with open_pdf(self.pdf_path) as doc:
+                pass
+            evict_pdf(self.pdf_path)
+            self.assertTrue(doc.is_closed)
+            with open_pdf(self.pdf_path) as reopened:
+                self.assertIsNot(reopened, doc)
+
+    @skipUnless(os.path.exists('/proc/self/maps'), 'needs procfs')
+    def test_extraction_leaves_no_mapping(self):
+        QuestionExtractor.extract_questions(self.pdf_path)
+        with open('/proc/self/maps') as maps:
+            self.assertNotIn(self.pdf_path, maps.read())
+
+
+class ExtractTextBlocksTest(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def make_pdf(self, page_count):
+        path = os.path.join(self.tmpdir.name, f'{page_count}.pdf')
+        make_pdf(path, [f'Page {i}' for i in range(page_count)])
+        return path
+
+    def page_numbers(self, text):
+        return [int(line.split()[1]) for line in text.splitlines() if line.startswith('Page')]
+
+    @mock.patch.object(pdf_service, '_get_page_pool')
+    def test_short_document_stays_in_process(self, get_page_pool):
+        pdf_path = self.make_pdf(2 * PAGES_PER_WORKER - 1)
+        with mock.patch.object(pdf_service.os, 'cpu_count', return_value=4):
+            text = QuestionExtractor._extract_text_blocks(pdf_path)
+        get_page_pool.assert_not_called()
+        self.assertEqual(self.page_numbers(text), list(range(2 * PAGES_PER_WORKER - 1)))
+
+    def test_long_document_uses_shared_pool_in_page_order(self):
+        pdf_path = self.make_pdf(2 * PAGES_PER_WORKER + 3)
+        self.addCleanup(pdf_service._reset_page_pool)
+        with mock.patch.object(pdf_service.os, 'cpu_count', return_value=2):
+            text = QuestionExtractor._extract_text_blocks(pdf_path)
+            pool = pdf_service._get_page_pool()
+            QuestionExtractor._extract_text_blocks(pdf_path)
+            self.assertIs(pdf_service._get_page_pool(), pool)
+        self.assertEqual(self.page_numbers(text), list(range(2 * PAGES_PER_WORKER + 3)))
+
+    @skipUnless(os.path.exists('/proc/self/maps'), 'needs procfs')
+    def test_pool_workers_release_document(self):
+        pdf_path = self.make_pdf(2 * PAGES_PER_WORKER)
+        self.addCleanup(pdf_service._reset_page_pool)
+        with mock.patch.object(pdf_service.os, 'cpu_count', return_value=2):
+            QuestionExtractor._extract_text_blocks(pdf_path)
+        for pid in pdf_service._get_page_pool()._processes:
+            with open(f'/proc/{pid}/maps') as maps:
+                self.assertNotIn(pdf_path, maps.read())
@@ -0,0 +1,142 @@
+# backend/core/tests/test_services/test_question_extractor.py
+import re
+import timeit
+from unittest import mock
+from django.test import SimpleTestCase
+from core.services.pdf_service import QuestionExtractor, TemplateRegistry
+
+
+class QuestionExtractorTest(SimpleTestCase):
+    def extract(self, text):
+        cleaned_text = QuestionExtractor._clean_text(text)
+        return QuestionExtractor._post_process_questions(
+            QuestionExtractor._extract_with_confidence(cleaned_text)
+        )
+
+    def test_large_question_id(self):
+        """IDs beyond the C int range are kept as-is"""
+        questions = self.extract("Question 99999999999 What is a stack?")
+        self.assertEqual(questions, [
+            {'question_id': 99999999999, 'question': 'What is a stack?'}
+        ])
+
+    def test_overlapping_formats_are_all_found(self):
+        """A numbered question spanning a Problem line does not hide it"""
+        matches = list(QuestionExtractor._extract_with_confidence(
+            '12\nProblem 4 abcdefghijk\n2. foo bar baz'
+        ))
+        self.assertEqual([q_id for q_id, _ in matches], [2, 4, 12])
+
+    def test_pattern_priority_per_question_id(self):
+        """The earlier pattern wins when two formats share an ID"""
+        matches = list(QuestionExtractor._extract_with_confidence(
+            '3. Numbered version of the question?\nQ3. Marked version of the question?'
+        ))
+        self.assertEqual(matches, [(3, 'Marked version of the question?')])
+
+
+def legacy_clean_text(text):
+    """The multi-pass cleaner _clean_text replaced, kept as the reference"""
+    for pattern in QuestionExtractor.NOISE_PATTERNS:
+        text = re.sub(pattern, '', text, flags=re.IGNORECASE)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\n\s*\n', '\n', text)
+    text = re.sub(r'Q\s*\.\s*', 'Q.', text)
+    text = re.sub(r'Question\s+', 'Question ', text)
+    text = re.sub(r'[^\w\s\n.?,:;()\[\]-]', '', text)
+    return text.strip()
+
+
+class CleanTextTest(SimpleTestCase):
+    SAMPLES = [
+        "",
+        "   \n\t  ",
+        "Q1. What is a stack?\nQ2. Define a queue.",
+        "Q 1 .  What is recursion?",
+        "Question\n\n  3   Explain hashing in detail.",
+        "1. First item\n\n\n2. Second item",
+        "[Q4] Describe a heap!!  #important",
+        "Problem 5: Compute 2 + 2 = ?\n",
+        "Here is the answer to the question: ignore this\nQ6. Keep this?",
+        "Q7. Sort the list. I hope this helps! Thanks",
+        "Q8. Trees\nIn summary, trees are graphs\nQ9. Graphs",
+        "PLEASE NOTE THAT case is ignored\nQ10. Next",
+        "Answer in HTML format: <b>bold</b> & more",
+        "Tabs\tand\u00a0non-breaking\u2003spaces",
+        "Caf\u00e9 na\u00efve \u2014 unicode * symbols @ #",
+        "a ** b  ** c",
+        "Let me know if you have any further questions.\n\nThe following are key points:\nQ11. End",
+    ]
+
+    def test_matches_legacy_cleaner(self):
+        for sample in self.SAMPLES:
+            with self.subTest(sample=sample):
+                self.assertEqual(QuestionExtractor._clean_text(sample), legacy_clean_text(sample))
+
+    def test_extracted_questions_match_legacy_cleaner(self):
+        text = "\n".join(self.SAMPLES)
+        self.assertEqual(
+            list(QuestionExtractor._extract_with_confidence(QuestionExtractor._clean_text(text))),
+            list(QuestionExtractor._extract_with_confidence(legacy_clean_text(text)))
+        )
+
+
+class TemplateRegistryTest(SimpleTestCase):
+    # Shared header longer than the fingerprint so both documents hash alike
+    HEADER = "Q1. What is a stack?" + " Explain it with an example." * 40
+
+    def setUp(self):
+        self.registry = TemplateRegistry()
+        patcher = mock.patch('core.services.pdf_service.template_registry', self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def question_ids(self, text):
+        return [q_id for q_id, _ in QuestionExtractor._extract_with_confidence(text)]
+
+    def test_miss_records_single_format_template(self):
+        text = self.HEADER + "\nQ2. Define a queue please?"
+        self.assertEqual(self.question_ids(text), [1, 2])
+        self.assertEqual(self.registry.get(TemplateRegistry.fingerprint(text)), 0)
+
+    def test_hit_scans_with_cached_pattern_only(self):
+        self.question_ids(self.HEADER + "\nQ2. Define a queue please?")
+        with mock.patch.object(
+            QuestionExtractor, '_select_matches', wraps=QuestionExtractor._select_matches
+        ) as select_matches:
+            ids = self.question_ids(self.HEADER + "\nQ4. Define a heap please?")
+        self.assertEqual(ids, [1, 4])
+        select_matches.assert_called_once()
+        self.assertEqual(select_matches.call_args.args[1], [QuestionExtractor._BRANCH_PATTERNS[0]])
+
+    def test_hit_with_other_format_matches_fresh_registry(self):
+        other_format = self.HEADER + "\n[Q3] Define a heap please?"
+        self.question_ids(self.HEADER + "\nQ2. Define a queue please?")
+        cached_ids = self.question_ids(other_format)
+        
+        self.registry = TemplateRegistry()
+        with mock.patch('core.services.pdf_service.template_registry', self.registry):
+            fresh_ids = self.question_ids(other_format)
+        self.assertEqual(cached_ids, [1, 3])
+        self.assertEqual(cached_ids, fresh_ids)
+
+    def test_text_without_line_breaks_skips_registry(self):
+        with mock.patch.object(self.registry, 'get') as get:
+            ids = self.question_ids(QuestionExtractor._clean_text(self.HEADER + "\nQ2. Define a queue?"))
+        get.assert_not_called()
+        self.assertEqual(ids, [1])
+
+    def test_hit_is_cheaper_than_miss(self):
+        text = "\n".join(
+            f"Q{i}. What is item {i} in the list?" + " Explain it with an example." * 10
+            for i in range(1, 500)
+        )
+        self.question_ids(text)
+        
+        def miss():
+            with mock.patch('core.services.pdf_service.template_registry', TemplateRegistry()):
+                self.question_ids(text)
+        
+        hit_time = min(timeit.repeat(lambda: self.question_ids(text), number=3, repeat=5))
+        miss_time = min(timeit.repeat(miss, number=3, repeat=5))
+        self.assertLess(hit_time, miss_time)
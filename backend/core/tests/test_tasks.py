@@ -0,0 +1,83 @@
+# backend/core/tests/test_tasks.py
+import os
+import tempfile
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from core import tasks
+from core.models.document import Document
+from core.tests.test_services.test_pdf_service import make_pdf
+
+
+class ProcessDocumentTaskTest(TestCase):
+    @mock.patch.object(tasks.PDFService, 'process_uploaded_pdf')
+    def test_processes_document(self, process_uploaded_pdf):
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        # bulk_create skips Document.save, which would stat the missing file
+        document = Document.objects.bulk_create([
+            Document(name='doc.pdf', file='documents/doc.pdf', user=user)
+        ])[0]
+
+        tasks.process_document_task(document.id)
+
+        process_uploaded_pdf.assert_called_once_with(document)
+
+    @mock.patch.object(tasks.PDFService, 'process_uploaded_pdf')
+    def test_skips_deleted_document(self, process_uploaded_pdf):
+        with self.assertLogs('core.tasks', 'WARNING'):
+            tasks.process_document_task(12345)
+
+        process_uploaded_pdf.assert_not_called()
+
+
+# Run tasks in-process; eager calls still build a producer, so the broker
+# and result backend are swapped for in-memory ones too
+@override_settings(
+    CELERY_TASK_ALWAYS_EAGER=True,
+    CELERY_BROKER_URL='memory://',
+    CELERY_RESULT_BACKEND='cache+memory://'
+)
+class ExtractDocumentQuestionsTest(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.pdf_path = os.path.join(self.tmpdir.name, 'assignment.pdf')
+        # Every block restarts at Q1, as in a bundle of separate exams
+        make_pdf(self.pdf_path, [
+            'Q1. What is a stack?', '',
+            'Q1. What is a heap?', '',
+            'Q1. What is a graph?'
+        ])
+        patcher = mock.patch.object(tasks, 'QUESTION_BLOCK_PAGES', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_extract_block_reads_only_its_pages(self):
+        self.assertEqual(
+            tasks.extract_questions_block.delay(self.pdf_path, 2, 4).get(),
+            ['What is a heap?']
+        )
+
+    def test_merge_renumbers_in_block_order(self):
+        merged = tasks.merge_matches.delay([['A?', 'B?'], [], ['C?']]).get()
+        self.assertEqual(merged, [
+            {'question_id': 1, 'question': 'A?'},
+            {'question_id': 2, 'question': 'B?'},
+            {'question_id': 3, 'question': 'C?'}
+        ])
+
+    def test_chord_merges_all_blocks(self):
+        with mock.patch.object(
+            tasks.extract_questions_block, 'run', wraps=tasks.extract_questions_block.run
+        ) as run_block:
+            questions = tasks.extract_document_questions(self.pdf_path).get(timeout=10)
+
+        self.assertEqual(
+            [call.args[1:] for call in run_block.call_args_list],
+            [(0, 2), (2, 4), (4, 5)]
+        )
+        self.assertEqual(questions, [
+            {'question_id': 1, 'question': 'What is a stack?'},
+            {'question_id': 2, 'question': 'What is a heap?'},
+            {'question_id': 3, 'question': 'What is a graph?'}
+        ])